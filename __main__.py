@@ -1,9 +1,19 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import argparse
+import functools
+import io
+import os
 import re
 import shutil
 
 
+_SCAN_RE = re.compile(
+    r"\\input\{(?P<inp>[^}\n]+)\}"
+    r"|\\includegraphics(?P<size>(?:\[[^\]]*\])?)\{(?:[^{}]*/)?(?P<path>[^}]+)\}"
+)
+
+
 def make_folder(folder: str):
     """Test to see if the given folder already exists, and if not, it will create the folder.
 
@@ -25,30 +35,26 @@ def get_data_from_file(path: str) -> str:
     Returns:
         str: Contents of the file as a string.
     """
-    file = Path(path)
-    assert file.is_file() and file.exists(), f"File {path} could not be found."
-    
-    with file.open("r") as input_file:
-        data = input_file.read()
-        
-    return data
+    try:
+        return _read_cached(str(Path(path).resolve()))
+    except FileNotFoundError:
+        raise FileNotFoundError(f"File {path} could not be found.") from None
 
 
-def write_file(output_file : Path, file_data : str) -> None:
-    """Write contents to a file. If the file does not exists yet, the file will be created. All previous content in the file will be overwritten!
+@functools.lru_cache(maxsize=None)
+def _read_cached(abs_path: str) -> str:
+    """Read a file, caching the contents so files that are input multiple times hit the disk once.
 
     Args:
-        output_file (Path): Path object of the output file.
-        file_data (str): Data that should be written to the sile
-    """    
-    if not output_file.exists():
-        output_file.touch()
-        
-    with output_file.open("w") as filewriter:
-        filewriter.write(file_data)
-        
-
-def parse_file(input_file_path: Path, project_folder: Path) -> str:
+        abs_path (str): Resolved absolute path of the file to read.
+
+    Returns:
+        str: Contents of the file as a string.
+    """
+    return Path(abs_path).read_text(encoding="utf-8")
+
+
+def parse_file(input_file_path: Path, project_folder: Path) -> tuple[str, list[str]]:
     """Parses the input file in order to remove all the \input statements from the file.
 
     Args:
@@ -56,92 +62,129 @@ def parse_file(input_file_path: Path, project_folder: Path) -> str:
         project_folder (Path): Input project folder.
 
     Returns:
-        str: Output content of the new LaTeX file.
+        tuple[str, list[str]]: Output content of the new LaTeX file and the list of graphics files it references.
     """
-    assert input_file_path.exists(), "Input file does not exist."
-    assert input_file_path.is_file(), "Input should be a file, not a folder."
-    
-    return_content = get_data_from_file(input_file_path)
-    
-    while find_amount_of_inputs(return_content) > 0:
-        input_statements, splitted_file = find_inputs_in_file(return_content)
-        
-        output_text = ""
-        
-        for i, input_statement in enumerate(input_statements):
-            output_text += splitted_file[i]
-            
-            file_path = project_folder / Path(input_statement)
-            
-            input_data = get_data_from_file(file_path)
-            
-            output_text += input_data
-        
-        if i < len(splitted_file) - 1:
-            output_text += splitted_file[-1] 
-        
-        return_content = output_text
-
-    return return_content
+    if not input_file_path.is_file():
+        raise FileNotFoundError(f"Input file {input_file_path} does not exist or is not a file.")
 
+    graphics_files = []
+    buffer = io.StringIO()
 
-def remove_path_graphics(input: str) -> str:
-    find = r"\\includegraphics(?P<size>.*){(?:.*/)?(?P<path>.*)}"
-    replace = r"\\includegraphics\g<size>{\g<path>}"
-    
-    return re.sub(find, replace, input)
-
+    _expand_into(buffer, input_file_path, project_folder, _index_tex_files(project_folder), set(), graphics_files)
 
-def find_graphics_in_file(input_file: str) -> tuple[list[str], list[str]]:
-    return re.findall(r"\\includegraphics(?:.*){(.*)}", input_file)
+    return buffer.getvalue(), graphics_files
 
 
-def find_amount_of_inputs(input_file: str) -> int:
-    """Find the amounts of inputs that are yet to be replaced in the input file.
+def _index_tex_files(project_folder: Path) -> dict[str, Path]:
+    """Map the project-relative posix path of every .tex file in the project to its location.
 
     Args:
-        input_file (str): Content of the input file to be checked.
+        project_folder (Path): Input project folder to index.
 
     Returns:
-        int: Number of inputs that should still be replaced.
-    """    
-    inputs, _ = find_inputs_in_file(input_file)
-    
-    return len(inputs)
+        dict[str, Path]: Mapping from relative path string to the file's path.
+    """
+    return {path.relative_to(project_folder).as_posix(): path for path in project_folder.rglob("*.tex")}
 
 
-def find_inputs_in_file(input_file: str) -> tuple[list[str], list[str]]:
-    """Find a list of input files and splits the output file around the inputs.
+def _expand_into(writer: io.TextIOBase, input_file_path: Path, project_folder: Path, known_tex: dict[str, Path], seen: set[Path], graphics_files: list[str]) -> None:
+    """Recursively write the given file to the writer with every input statement expanded in place.
+
+    Streaming each chunk to the writer keeps peak memory at the size of the largest
+    single file instead of the size of the whole expanded document.
 
     Args:
-        input_file (str): Contents of input file where the inputs should be replaced.
+        writer (io.TextIOBase): Open text stream the expanded content is written to.
+        input_file_path (Path): File whose contents should be expanded.
+        project_folder (Path): Input project folder that input statements are relative to.
+        known_tex (dict[str, Path]): Index of the project's .tex files used to resolve input statements.
+        seen (set[Path]): Files on the current recursion path, used to detect circular inputs.
+        graphics_files (list[str]): Accumulator that referenced graphics files are appended to.
+    """
+    if input_file_path in seen:
+        raise RecursionError(f"Circular \\input detected for {input_file_path}.")
 
-    Returns:
-        tuple[list[str], list[str]]: tuple of first the list of files that should be included and second a list of the contents of the file around the inputs.
-    """    
-    input_statements = re.findall("\\\\input{(.*)}", input_file)
-    
-    splitted_file = re.split("\\\\input{.*}", input_file)
-    return input_statements,splitted_file
-    
-    
-def extract_graphics_files(project_folder: Path, output_folder: Path, new_file_data: str) -> None:
+    seen.add(input_file_path)
+
+    text = get_data_from_file(input_file_path)
+
+    input_start = text.find("\\input{")
+    graphic_start = text.find("\\includegraphics")
+
+    if input_start == -1 and graphic_start == -1:
+        seen.discard(input_file_path)
+        writer.write(text)
+        return
+
+    scan_start = min(start for start in (input_start, graphic_start) if start != -1)
+
+    last_end = 0
+
+    for match in _SCAN_RE.finditer(text, scan_start):
+        writer.write(text[last_end:match.start()])
+
+        if match.lastgroup == "inp":
+            statement = match.group("inp")
+            target = known_tex.get(statement) or known_tex.get(statement + ".tex") or project_folder / statement
+
+            _expand_into(writer, target, project_folder, known_tex, seen, graphics_files)
+        else:
+            graphics_files.append(match.group("path"))
+
+            if "/" in match.group(0):
+                writer.write(f"\\includegraphics{match.group('size')}{{{match.group('path')}}}")
+            else:
+                writer.write(match.group(0))
+
+        last_end = match.end()
+
+    writer.write(text[last_end:])
+
+    seen.discard(input_file_path)
+
+
+def extract_graphics_files(project_folder: Path, output_folder: Path, graphics_files: list[str]) -> None:
     """Function to move all the included graphics files to the output folder.
 
     Args:
         project_folder (Path): Input project folder
         output_folder (Path): Output folder of the project
-        new_file_data (str): Data of the main LaTeX file
-    """    
-    files = find_graphics_in_file(new_file_data)
-    
-    for file in files:
-        possible_files = list(project_folder.glob(file + ".*")) + list(project_folder.glob(file))
-        
+        graphics_files (list[str]): Graphics files referenced by the main LaTeX file
+    """
+    by_stem: dict[str, list[Path]] = {}
+    by_name: dict[str, list[Path]] = {}
+
+    for path in project_folder.rglob("*"):
+        if path.is_file():
+            by_stem.setdefault(path.stem, []).append(path)
+            by_name.setdefault(path.name, []).append(path)
+
+    copy_pairs = []
+
+    for file in graphics_files:
+        possible_files = dict.fromkeys(by_stem.get(file, []) + by_name.get(file, []))
+
         for possible_file in possible_files:
-            output_file = output_folder / Path(possible_file.name)
+            output_file = output_folder / possible_file.name
+
+            copy_pairs.append((possible_file, output_file))
+
+    _copy_files(copy_pairs)
+
+
+def _copy_files(copy_pairs: list[tuple[Path, Path]]) -> None:
+    """Copy (source, destination) file pairs concurrently so per-file I/O latency overlaps.
+
+    Args:
+        copy_pairs (list[tuple[Path, Path]]): Pairs of source and destination paths to copy.
+    """
+    if not copy_pairs:
+        return
+
+    max_workers = min(32, (os.cpu_count() or 1) * 4)
 
-            shutil.copyfile(str(possible_file), str(output_file.absolute()))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(lambda pair: shutil.copyfile(pair[0], pair[1]), copy_pairs))
     
             
 def copy_bib_files(project_folder: Path, output_folder: Path) -> None:
@@ -151,10 +194,9 @@ def copy_bib_files(project_folder: Path, output_folder: Path) -> None:
         project_folder (Path): Input project folder
         output_folder (Path): Output folder of the project
     """    
-    bib_files = project_folder.glob("*.bib")
-    
-    for bib_file in bib_files:
-        shutil.copyfile(str(bib_file), str(output_folder / Path(bib_file.name)))
+    copy_pairs = [(bib_file, output_folder / bib_file.name) for bib_file in project_folder.glob("*.bib")]
+
+    _copy_files(copy_pairs)
 
     
 def main(input_file: Path, output_folder: Path) -> None:
@@ -164,20 +206,27 @@ def main(input_file: Path, output_folder: Path) -> None:
         input_file (Path): Input path of the main input file.
         output_folder (Path): Folder where the output is written to.
     """    
+    if not input_file.is_file():
+        raise FileNotFoundError(f"Input file {input_file} does not exist or is not a file.")
+
+    input_file = input_file.absolute()
+    output_folder = output_folder.absolute()
+
     make_folder(output_folder)
-    
-    project_folder = input_file.parent.absolute()
-    
-    new_file_data = parse_file(input_file, project_folder)
-    
-    extract_graphics_files(project_folder, output_folder, new_file_data)
-        
-    new_file_data = remove_path_graphics(new_file_data)
-    
-    output_file = output_folder / Path(input_file.name)
-    
-    write_file(output_file, new_file_data)
+
+    project_folder = input_file.parent
+
+    output_file = output_folder / input_file.name
+
+    graphics_files = []
+
+    with output_file.open("w", encoding="utf-8", buffering=1 << 20) as writer:
+        _expand_into(writer, input_file, project_folder, _index_tex_files(project_folder), set(), graphics_files)
+
+    extract_graphics_files(project_folder, output_folder, graphics_files)
     copy_bib_files(project_folder, output_folder)
+
+    _read_cached.cache_clear()
     
 
 def parse_args() -> tuple[Path, Path]: